@@ -1,48 +1,160 @@
 # app.py
-# app.py
+import hashlib
+import io
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
 from kneed import KneeLocator
 
 # Streamlit page configuration
 st.set_page_config(page_title="CGHS Wellness Dashboard", layout="wide")
 st.title("\U0001F3E5 CGHS Wellness Center Dashboard")
 
+# Above this many centers the per-center scatter gives way to a top-N bar chart
+MAX_SCATTER_CENTERS = 500
+TOP_BAR_CENTERS = 200
+
+# Hover reads from arrays already in the trace, so no customdata is shipped. Bars keep
+# center names on the x-axis; the scatter uses a rank axis and carries names as text.
+BAR_HOVER_TEMPLATE = "%{x}<br>Beneficiaries=%{y}<br>Cluster=%{marker.color}<extra></extra>"
+SCATTER_HOVER_TEMPLATE = "%{text}<br>Beneficiaries=%{y}<br>Cluster=%{marker.color}<extra></extra>"
+
+# Accepted spellings of the center name column in the centers workbook
+CENTER_NAME_COLUMNS = {'Wellness Center', 'wellnessCentreName', 'WellnessCentreName', 'Center Name'}
+
+# Beneficiary columns used downstream; everything else in the CSV is skipped at parse time
+BENEFICIARY_COLUMNS = {'Wellness Center', 'City'}
+
 # Sidebar for file upload
 st.sidebar.header("📁 Upload Data Files")
 uploaded_excel = st.sidebar.file_uploader("Upload cleaned dataset (.xlsx)", type=["xlsx"])
 uploaded_csv = st.sidebar.file_uploader("Upload beneficiaries data (.csv)", type=["csv"])
 
-@st.cache_data
-def load_data(excel_file, csv_file):
+@st.cache_data(show_spinner=False)
+def _parse(xlsx_bytes, csv_bytes):
+    # Keyed on raw file bytes, so reruns with the same uploads skip parsing entirely
     try:
-        if excel_file is None or csv_file is None:
-            return pd.DataFrame(), pd.DataFrame()
-
-        centers_df = pd.read_excel(excel_file)
-        beneficiaries_df = pd.read_csv(csv_file)
+        centers_df = pd.read_excel(io.BytesIO(xlsx_bytes), engine="openpyxl")
+        # Only the required beneficiary columns are parsed. They are matched against the raw
+        # header first, so usecols and dtype still apply when names carry stray whitespace
+        header = pd.read_csv(io.BytesIO(csv_bytes), nrows=0).columns
+        wanted = [col for col in header if col.strip() in BENEFICIARY_COLUMNS]
+        if {col.strip() for col in wanted} == BENEFICIARY_COLUMNS:
+            beneficiaries_df = pd.read_csv(
+                io.BytesIO(csv_bytes),
+                usecols=wanted,
+                dtype=dict.fromkeys(wanted, 'category'),
+                engine="c"
+            )
+        else:
+            # Projecting would leave an empty frame and the file would be reported as not
+            # uploaded; keep the full header and a row so the missing-columns check names the gap
+            beneficiaries_df = pd.read_csv(io.BytesIO(csv_bytes), nrows=1)
 
-        centers_df.columns = centers_df.columns.str.strip()
+        # Headers are normalized once here, so nothing downstream re-strips or re-renames
+        centers_df.columns = centers_df.columns.map(str).str.strip()
         beneficiaries_df.columns = beneficiaries_df.columns.str.strip()
 
+        # Rename to standard column name
+        center_col = next((col for col in centers_df.columns if col in CENTER_NAME_COLUMNS), None)
+        if center_col is not None:
+            centers_df = centers_df.rename(columns={center_col: 'Wellness Center'})
+
+        # Center names repeat heavily; categorical codes make counting and plotting cheaper
+        for df in (centers_df, beneficiaries_df):
+            if 'Wellness Center' in df.columns:
+                df['Wellness Center'] = df['Wellness Center'].astype('category')
+
         return centers_df, beneficiaries_df
     except Exception as e:
         st.error(f"❌ Error loading data: {str(e)}")
         return pd.DataFrame(), pd.DataFrame()
 
+def load_data(excel_file, csv_file):
+    if excel_file is None or csv_file is None:
+        return pd.DataFrame(), pd.DataFrame()
+    return _parse(excel_file.getvalue(), csv_file.getvalue())
+
+# Clustering steps; the elbow pass runs once per file and _cluster only backtracks it
+def _prefix_sums(counts):
+    # Exact 1-D k-means: clusters are contiguous runs of the sorted values, so every
+    # k can be solved by one dynamic program over prefix sums of the unique values.
+    values, weights = np.unique(counts.astype(np.float64), return_counts=True)
+    n = np.concatenate(([0], np.cumsum(weights)))
+    s1 = np.concatenate(([0.0], np.cumsum(values * weights)))
+    s2 = np.concatenate(([0.0], np.cumsum(values ** 2 * weights)))
+    return values, (n, s1, s2)
+
+def _segment_cost(sums, i, j):
+    # SSE of the sorted values i..j-1 taken as a single cluster (0 for an empty one)
+    n, s1, s2 = sums
+    size = n[j] - n[i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cost = s2[j] - s2[i] - (s1[j] - s1[i]) ** 2 / size
+    return np.where(size > 0, np.maximum(cost, 0.0), 0.0)
+
+def _dp_step(prev, sums):
+    # One more cluster: cur[j] = min over i <= j of prev[i] + cost(i, j). The 1-D cost
+    # is Monge, so the best split point is monotone in j and can be found by divide and
+    # conquer. Each level of the recursion is evaluated for all open ranges at once, which
+    # keeps the work at O(m log m) and the memory at O(m) instead of an m x m cost matrix.
+    m = len(prev) - 1
+    cur = np.empty(m + 1)
+    arg = np.empty(m + 1, dtype=np.intp)
+
+    # Open ranges: targets j in [lo, hi] whose best split lies in [ilo, ihi]
+    lo, hi = np.array([0]), np.array([m])
+    ilo, ihi = np.array([0]), np.array([m])
+    while len(lo):
+        mid = (lo + hi) // 2
+        size = np.minimum(mid, ihi) - ilo + 1
+        starts = np.cumsum(size) - size
+        seg = np.repeat(np.arange(len(mid)), size)
+        i = np.arange(size.sum()) - starts[seg] + ilo[seg]
+        totals = prev[i] + _segment_cost(sums, i, mid[seg])
+
+        # Leftmost minimum per range keeps the split points monotone under ties
+        mins = np.minimum.reduceat(totals, starts)
+        hits = np.flatnonzero(totals == mins[seg])
+        first = hits[np.r_[True, seg[hits][1:] != seg[hits][:-1]]]
+        best = i[first]
+        cur[mid], arg[mid] = mins, best
+
+        left, right = lo < mid, mid < hi
+        lo, hi = np.r_[lo[left], mid[right] + 1], np.r_[mid[left] - 1, hi[right]]
+        ilo, ihi = np.r_[ilo[left], best[right]], np.r_[best[left], ihi[right]]
+    return cur, arg
+
+def _elbow(counts, max_k=10):
+    # Keeps each layer's split points so any k up to max_k can be labelled without
+    # rerunning the DP
+    values, sums = _prefix_sums(counts)
+    best = _segment_cost(sums, 0, np.arange(len(values) + 1))
+    wcss = [float(best[-1])]
+    splits = []
+    for _ in range(2, max_k + 1):
+        best, split = _dp_step(best, sums)
+        wcss.append(float(best[-1]))
+        splits.append(split)
+    return wcss, values, splits
+
+def _cluster(counts, k, values, splits):
+    # Walk the split points back from the full range to get each cluster's first value
+    cuts = [len(values)]
+    for split in reversed(splits[:k - 1]):
+        cuts.append(split[cuts[-1]])
+    cuts = np.array(cuts[:0:-1])
+    # k above the number of distinct counts leaves empty clusters; drop them
+    cuts = np.unique(cuts[(cuts > 0) & (cuts < len(values))])
+
+    # Labels come out ordered by centroid: cluster 0 holds the smallest counts
+    return np.searchsorted(cuts, np.searchsorted(values, counts), side='right')
+
 # Load data
 centers_df, beneficiaries_df = load_data(uploaded_excel, uploaded_csv)
 
-# Rename to standard column name
-if not centers_df.empty:
-    for col in centers_df.columns:
-        if col.strip() in ['Wellness Center', 'wellnessCentreName', 'WellnessCentreName', 'Center Name']:
-            centers_df.rename(columns={col: 'Wellness Center'}, inplace=True)
-            break
-
 # Validate required columns
 def check_required_columns(df, required_columns, df_name):
     if not isinstance(df, pd.DataFrame):
@@ -65,13 +177,13 @@ if uploaded_excel is None or uploaded_csv is None:
 # Column validation
 if not check_required_columns(centers_df, {'Wellness Center'}, "Centers Data"):
     st.stop()
-if not check_required_columns(beneficiaries_df, {'Wellness Center', 'City'}, "Beneficiaries Data"):
+if not check_required_columns(beneficiaries_df, BENEFICIARY_COLUMNS, "Beneficiaries Data"):
     st.stop()
 
 st.success("✅ Data loaded successfully!")
 
-# Preview data
-with st.expander("🔍 Preview Uploaded Data"):
+# Preview data (expander bodies always run, so a checkbox keeps the tables off the wire until asked for)
+if st.checkbox("🔍 Preview Uploaded Data", value=False):
     st.subheader("Centers Data")
     st.dataframe(centers_df.head())
     st.subheader("Beneficiaries Data")
@@ -81,33 +193,31 @@ with st.expander("🔍 Preview Uploaded Data"):
 st.header("📊 KMeans Clustering on Beneficiaries Data")
 
 try:
-    grouped_df = beneficiaries_df.groupby('Wellness Center').size().reset_index(name='Beneficiary Count')
+    # Counts and the elbow sweep only depend on the beneficiaries file; reuse them from
+    # session state while its content is unchanged so slider moves skip straight to clustering
+    csv_hash = hashlib.blake2b(uploaded_csv.getvalue(), digest_size=8).hexdigest()
+    cached = st.session_state.get('clustering_state')
+    if cached is None or cached['csv_hash'] != csv_hash:
+        # Count straight off the categorical codes; categories are already in sorted order.
+        # Names, counts and cluster labels stay as aligned arrays rather than a DataFrame
+        centers = beneficiaries_df['Wellness Center'].cat
+        codes = centers.codes.to_numpy()
+        names = centers.categories
+        counts = np.bincount(codes[codes >= 0], minlength=len(names))
 
-    # Standardize
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(grouped_df[['Beneficiary Count']])
+        # 1-D k-means is invariant to affine scaling, so cluster the raw counts directly
+        wcss, values, splits = _elbow(counts)
+        cached = dict(csv_hash=csv_hash, names=names, counts=counts, wcss=wcss, values=values, splits=splits)
+        st.session_state['clustering_state'] = cached
 
-    # Function to compute WCSS
-    def calculate_wcss(data):
-        wcss = []
-        for i in range(1, 11):
-            kmeans = KMeans(n_clusters=i, random_state=42)
-            kmeans.fit(data)
-            wcss.append(kmeans.inertia_)
-        return wcss
+    names, counts = cached['names'], cached['counts']
+    wcss, values, splits = cached['wcss'], cached['values'], cached['splits']
 
     # Elbow method
     st.subheader("📈 Elbow Method (Optional: Determine Optimal Clusters)")
-    wcss = calculate_wcss(X_scaled)
-
-    fig_elbow = px.line(
-        x=list(range(1, 11)),
-        y=wcss,
-        markers=True,
-        labels={'x': 'Number of Clusters', 'y': 'WCSS'},
-        title="Elbow Method For Optimal Clusters"
-    )
-    st.plotly_chart(fig_elbow, use_container_width=True)
+
+    # Ten points don't need an interactive Plotly figure; Streamlit's native chart is lighter
+    st.line_chart(pd.Series(wcss, index=pd.RangeIndex(1, 11, name='Number of Clusters'), name='WCSS'))
 
     # Optimal cluster suggestion
     kneedle = KneeLocator(range(1, 11), wcss, curve='convex', direction='decreasing')
@@ -117,36 +227,73 @@ try:
     # Cluster selection
     n_clusters = st.sidebar.slider('Select number of clusters:', min_value=2, max_value=10, value=optimal_k or 3)
 
-    # Apply KMeans
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    grouped_df['Cluster'] = kmeans.fit_predict(X_scaled)
-
-    # Interactive Plotly scatter plot
-    fig_plotly = px.scatter(
-        grouped_df,
-        x='Wellness Center',
-        y='Beneficiary Count',
-        color=grouped_df['Cluster'].astype(str),
-        title='📊 Clustering of Wellness Centers Based on Beneficiaries',
-        labels={
-            'Wellness Center': 'Wellness Center',
-            'Beneficiary Count': 'Number of Beneficiaries',
-            'Cluster': 'Cluster'
-        },
-        hover_data=['Wellness Center', 'Beneficiary Count', 'Cluster']
+    # Apply 1-D k-means
+    clusters = _cluster(counts, n_clusters, values, splits)
+
+    # Integer labels on a stepped Viridis scale: one trace, one flat color per cluster
+    steps = sample_colorscale('Viridis', [i / max(n_clusters - 1, 1) for i in range(n_clusters)])
+    cluster_colors = dict(
+        colorscale=[(edge / n_clusters, color) for i, color in enumerate(steps) for edge in (i, i + 1)],
+        cmin=-0.5,
+        cmax=n_clusters - 0.5,
+        showscale=True,
+        colorbar=dict(title='Cluster', tickvals=list(range(n_clusters)))
     )
 
+    # Interactive Plotly plot: per-center scatter for small inputs, otherwise a bar
+    # chart of the busiest centers so the browser isn't drawing thousands of marks
+    if len(counts) > MAX_SCATTER_CENTERS:
+        top = np.argsort(-counts, kind='stable')[:TOP_BAR_CENTERS]
+        fig_plotly = go.Figure(
+            go.Bar(
+                x=names[top],
+                y=counts[top],
+                marker=dict(color=clusters[top], **cluster_colors),
+                hovertemplate=BAR_HOVER_TEMPLATE,
+            )
+        )
+        fig_plotly.update_layout(
+            title=f'📊 Top {TOP_BAR_CENTERS} of {len(counts)} Wellness Centers by Beneficiaries',
+            xaxis_title='Wellness Center',
+            xaxis_tickangle=45,
+            margin=dict(t=50, b=200)
+        )
+    else:
+        # One WebGL trace, colored by cluster label. Centers are placed on a numeric rank
+        # axis (sorted by count) so Plotly doesn't lay out a rotated text tick per center.
+        order = np.argsort(counts, kind='stable')
+        fig_plotly = go.Figure(
+            go.Scattergl(
+                x=np.arange(len(order)),
+                y=counts[order],
+                text=names[order],
+                mode='markers',
+                marker=dict(color=clusters[order], **cluster_colors),
+                hovertemplate=SCATTER_HOVER_TEMPLATE,
+            )
+        )
+        fig_plotly.update_layout(
+            title='📊 Clustering of Wellness Centers Based on Beneficiaries',
+            xaxis_title='Wellness Centers (ranked by beneficiaries)',
+            xaxis_showticklabels=False,
+            margin=dict(t=50)
+        )
+
     fig_plotly.update_layout(
-        xaxis_tickangle=45,
+        yaxis_title='Number of Beneficiaries',
         height=700,
-        margin=dict(t=50, b=200),
-        showlegend=True
+        hovermode='closest',
+        spikedistance=0
     )
 
     st.plotly_chart(fig_plotly, use_container_width=True)
 
-    with st.expander("🔍 View Cluster Assignments"):
-        st.dataframe(grouped_df)
+    if st.checkbox("🔍 View Cluster Assignments", value=False):
+        st.dataframe(pd.DataFrame({
+            'Wellness Center': names,
+            'Beneficiary Count': counts,
+            'Cluster': clusters
+        }))
 
 except Exception as e:
     st.error(f"⚠️ Clustering failed: {str(e)}")